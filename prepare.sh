@@ -0,0 +1,25 @@
+#!/usr/bin/env bash
+#
+# Rechunk the ERSST source file so each time step is one (lat, lon) chunk.
+# process_data.py and convert_to_json.py walk the cube time step by time
+# step and pick up the rechunked file automatically unless the source is
+# newer (re-run this script after re-downloading sst.mnmean.nc).
+#
+# Usage: ./prepare.sh [input.nc] [output.nc]
+# Requires nccopy/ncdump (netCDF-C utilities).
+
+set -euo pipefail
+
+SRC="${1:-sst.mnmean.nc}"
+DST="${2:-sst.chunked.nc}"
+
+dim_size() {
+    ncdump -h "$SRC" | awk -v dim="$1" '$1 == dim && $2 == "=" { print $3; exit }'
+}
+
+NLAT=$(dim_size lat)
+NLON=$(dim_size lon)
+
+echo "Rechunking $SRC → $DST (time/1, lat/$NLAT, lon/$NLON)..."
+nccopy -k 4 -d 1 -c "time/1,lat/${NLAT},lon/${NLON}" "$SRC" "$DST"
+echo "Done: $DST"
@@ -2,9 +2,15 @@
 """
 Convert NetCDF SST data to compact binary format for web visualization.
 
-Input:  sst.mnmean.nc (NOAA ERSST v5 Monthly Mean)
-Output: docs/data/metadata.json  - grid info, time labels, bounds
-        docs/data/sst_data.bin   - uint8 binary array [time × lat × lon]
+Input:  sst.mnmean.nc (NOAA ERSST v5 Monthly Mean), or sst.chunked.nc
+        if prepare.sh has rechunked it and it is not older than the source
+Output: docs/data/metadata.json        - grid info, time labels, bounds
+        docs/data/sst_data.bin         - uint8 binary array [time × lat × lon]
+        docs/data/sst_data_tpose.bin   - same array as [lat × lon × time],
+                                         for per-pixel time series
+        docs/data/sst_u8.nc            - same uint8 codes as a NetCDF, with
+                                         scale_factor/add_offset/_FillValue
+                                         attributes, one chunk per time step
 
 Encoding: SST values mapped from [-2°C, 32°C] → [0, 254] uint8
           255 = no data (NaN / land)
@@ -13,10 +19,21 @@ Encoding: SST values mapped from [-2°C, 32°C] → [0, 254] uint8
 
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import xarray as xr
+from numba import njit, prange, set_num_threads
 
-DATA_FILE = "sst.mnmean.nc"
+SOURCE_FILE = "sst.mnmean.nc"
+CHUNKED_FILE = "sst.chunked.nc"  # written by prepare.sh
+# Use the rechunked copy only if it is at least as new as the source
+DATA_FILE = (
+    CHUNKED_FILE
+    if os.path.exists(CHUNKED_FILE) and (
+        not os.path.exists(SOURCE_FILE)
+        or os.path.getmtime(CHUNKED_FILE) >= os.path.getmtime(SOURCE_FILE))
+    else SOURCE_FILE
+)
 OUTPUT_DIR = "docs/data"
 
 # SST mapping range
@@ -25,40 +42,125 @@ SST_MAX = 32.0
 SST_RANGE = SST_MAX - SST_MIN
 NODATA = 255
 
+# Frames converted per batch (also the dask chunk size along time)
+BATCH_SIZE = 128
 
-def process():
-    """Convert NetCDF to binary format for web visualization."""
+# Worker processes for the frame conversion
+MAX_WORKERS = os.cpu_count() or 1
+
+
+# fastmath without 'nnan'/'ninf' so the NaN test is not optimized away
+@njit(parallel=True, fastmath={'contract', 'arcp', 'nsz', 'afn'}, cache=True)
+def quantize(frames, out, sst_min, scale, nodata):
+    """Map float SST frames to uint8 codes in a single parallel pass."""
+    ntimes, nlat, nlon = frames.shape
+    for k in prange(ntimes * nlat):
+        t = k // nlat
+        i = k % nlat
+        for j in range(nlon):
+            v = frames[t, i, j]
+            if np.isnan(v):
+                out[t, i, j] = nodata
+            else:
+                out[t, i, j] = np.uint8(min(max((v - sst_min) * scale, 0.0), 254.0))
+
+
+def convert_frames(output_path, shape, start, stop, lat_step, lon_shift):
+    """Quantize frames [start, stop) into the shared memory-mapped output."""
+    # Parallelism comes from the process pool; keep the kernel single-threaded
+    set_num_threads(1)
+
+    ds = xr.open_dataset(DATA_FILE, chunks={'time': BATCH_SIZE, 'lat': -1, 'lon': -1})
+    sst = ds['sst']
+    binary_data = np.memmap(output_path, dtype=np.uint8, mode='r+', shape=shape)
+
+    scale = 254.0 / SST_RANGE
+    buf = np.empty((BATCH_SIZE,) + shape[1:], dtype=np.float32)
+
+    for batch in range(start, stop, BATCH_SIZE):
+        batch_stop = min(batch + BATCH_SIZE, stop)
+
+        # Reorder: flip latitudes and roll longitudes in a single copy
+        src = sst.isel(time=slice(batch, batch_stop)).values[:, ::lat_step]
+        frames = buf[:batch_stop - batch]
+        np.concatenate((src[:, :, lon_shift:], src[:, :, :lon_shift]), axis=2, out=frames)
+
+        # Map to uint8: [-2, 32] → [0, 254]
+        quantize(frames, binary_data[batch:batch_stop], SST_MIN, scale, NODATA)
+
+    binary_data.flush()
+    ds.close()
+    return stop - start
+
+
+def write_netcdf(codes, path, sst, lats, lons):
+    """Write the quantized uint8 codes as a self-describing packed NetCDF."""
+    # Source lon range is 0-360; the output grid is -180 to 180
+    lon_attrs = {k: v for k, v in sst.lon.attrs.items() if k != 'actual_range'}
+    attrs = {k: v for k, v in sst.attrs.items() if k in ('long_name', 'units')}
+
+    # Codes are stored as-is; CF readers decode them with the attributes
+    out = xr.DataArray(
+        codes,
+        dims=('time', 'lat', 'lon'),
+        coords={
+            'time': sst.time,
+            'lat': ('lat', lats, sst.lat.attrs),
+            'lon': ('lon', lons, lon_attrs),
+        },
+        name='sst',
+        attrs={**attrs, 'scale_factor': SST_RANGE / 254, 'add_offset': SST_MIN},
+    )
+    out.encoding = {
+        '_FillValue': np.uint8(NODATA),
+        'zlib': True,
+        'complevel': 4,
+        'chunksizes': (1,) + codes.shape[1:],
+    }
+    out.to_netcdf(path)
+
+
+def process(output_dir=OUTPUT_DIR, extra_outputs=True):
+    """Convert NetCDF to binary format for web visualization.
+
+    extra_outputs also writes sst_data_tpose.bin and sst_u8.nc next to
+    sst_data.bin; disable it for sites that only read sst_data.bin.
+    """
     print("=" * 60)
     print("NetCDF → Binary Data Processor")
     print("=" * 60)
 
     print(f"\nLoading {DATA_FILE}...")
-    ds = xr.open_dataset(DATA_FILE)
+    ds = xr.open_dataset(DATA_FILE, chunks={'time': BATCH_SIZE, 'lat': -1, 'lon': -1})
     sst = ds['sst']
 
     lons = sst.lon.values
     lats = sst.lat.values
     times = sst.time.values
+    if len(times) == 0:
+        raise ValueError(f"{DATA_FILE} has no time steps to convert")
 
     print(f"  Grid: {len(lats)} lat × {len(lons)} lon")
     print(f"  Time range: {str(times[0])[:10]} → {str(times[-1])[:10]}")
     print(f"  Time steps: {len(times)}")
 
-    # Convert longitudes from 0-360 to -180 to 180
+    # Convert longitudes from 0-360 to -180 to 180. The 0-360 grid is
+    # monotonic, so sorting is a cyclic shift past the last lon <= 180.
     lons_converted = np.where(lons > 180, lons - 360, lons)
-    lon_sort = np.argsort(lons_converted)
-    lons_sorted = lons_converted[lon_sort]
+    lon_shift = int(np.searchsorted(lons, 180.0, side='right'))
+    lons_sorted = np.roll(lons_converted, -lon_shift)
 
-    # Flip latitudes to go north → south (image convention: top = north)
-    lat_flip = np.argsort(-lats)
-    lats_sorted = lats[lat_flip]
+    # Latitudes go north → south (image convention: top = north);
+    # flip them with a reversed view if stored south → north
+    lat_step = -1 if lats[0] < lats[-1] else 1
+    lats_sorted = lats[::lat_step]
 
     nlat = len(lats)
     nlon = len(lons)
     ntimes = len(times)
 
     # Time labels in YYYY-MM format
-    time_labels = [str(t)[:7] for t in times]
+    time_labels = np.datetime_as_string(times, unit='M').tolist()
 
     # Half cell size for bounds (data points are cell centers)
     half_lon = float(abs(lons_sorted[1] - lons_sorted[0]) / 2)
@@ -70,8 +172,8 @@ def process():
         "nlon": nlon,
         "ntimes": ntimes,
         "times": time_labels,
-        "lats": [float(x) for x in lats_sorted],
-        "lons": [float(x) for x in lons_sorted],
+        "lats": lats_sorted.tolist(),
+        "lons": lons_sorted.tolist(),
         "bounds": {
             "north": float(lats_sorted[0] + half_lat),
             "south": float(lats_sorted[-1] - half_lat),
@@ -83,47 +185,69 @@ def process():
             "max": SST_MAX,
             "nodata": NODATA,
             "description": "uint8: 0-254 maps to -2°C to 32°C, 255 = no data"
-        }
+        },
+        "files": [
+            {"name": "sst_data.bin", "layout": ["time", "lat", "lon"]}
+        ]
     }
+    if extra_outputs:
+        metadata["files"] += [
+            {"name": "sst_data_tpose.bin", "layout": ["lat", "lon", "time"]},
+            {"name": "sst_u8.nc", "layout": ["time", "lat", "lon"]}
+        ]
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
 
-    with open(f"{OUTPUT_DIR}/metadata.json", 'w') as f:
+    with open(f"{output_dir}/metadata.json", 'w') as f:
         json.dump(metadata, f, indent=2)
     print(f"\n✓ Saved metadata.json")
 
-    # Process all frames into a single binary array
+    # Process all frames straight into the memory-mapped output file
     print(f"\nConverting {ntimes} time steps to uint8 binary...")
-    binary_data = np.empty((ntimes, nlat, nlon), dtype=np.uint8)
-
-    for i in range(ntimes):
-        frame = sst.isel(time=i).values
+    output_path = f"{output_dir}/sst_data.bin"
+    binary_data = np.memmap(output_path, dtype=np.uint8, mode='w+',
+                            shape=(ntimes, nlat, nlon))
 
-        # Reorder: sort longitudes and flip latitudes
-        frame = frame[:, lon_sort]
-        frame = frame[lat_flip, :]
+    # Workers attach to the same file and each fill a range of whole batches
+    nbatches = -(-ntimes // BATCH_SIZE)
+    workers = min(MAX_WORKERS, nbatches)
+    step = -(-nbatches // workers) * BATCH_SIZE
+    done = 0
 
-        # Map to uint8: [-2, 32] → [0, 254]
-        normalized = (frame - SST_MIN) / SST_RANGE
-        scaled = np.clip(normalized * 254, 0, 254).astype(np.uint8)
-        scaled[np.isnan(frame)] = NODATA
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(convert_frames, output_path, binary_data.shape,
+                            start, min(start + step, ntimes), lat_step, lon_shift)
+            for start in range(0, ntimes, step)
+        ]
+        for future in as_completed(futures):
+            done += future.result()
+            print(f"  Processed {done}/{ntimes} frames...")
 
-        binary_data[i] = scaled
+    binary_data.flush()
 
-        if (i + 1) % 200 == 0 or i == 0:
-            print(f"  Processed {i + 1}/{ntimes} frames...")
+    if extra_outputs:
+        # Time-series layout: each pixel's values are contiguous
+        tpose_path = f"{output_dir}/sst_data_tpose.bin"
+        np.ascontiguousarray(binary_data.transpose(1, 2, 0)).tofile(tpose_path)
 
-    # Save as raw binary
-    output_path = f"{OUTPUT_DIR}/sst_data.bin"
-    binary_data.tofile(output_path)
+        # The same codes as a self-describing NetCDF
+        print(f"\nWriting packed uint8 NetCDF...")
+        nc_path = f"{output_dir}/sst_u8.nc"
+        write_netcdf(binary_data, nc_path, sst, lats_sorted, lons_sorted)
+    del binary_data
 
     file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
-    meta_size_kb = os.path.getsize(f"{OUTPUT_DIR}/metadata.json") / 1024
+    meta_size_kb = os.path.getsize(f"{output_dir}/metadata.json") / 1024
 
     print(f"\n{'=' * 60}")
     print(f"✓ Done!")
     print(f"  Binary data:  {file_size_mb:.1f} MB  ({output_path})")
-    print(f"  Metadata:     {meta_size_kb:.1f} KB  ({OUTPUT_DIR}/metadata.json)")
+    if extra_outputs:
+        nc_size_mb = os.path.getsize(nc_path) / (1024 * 1024)
+        print(f"  Transposed:   {file_size_mb:.1f} MB  ({tpose_path})")
+        print(f"  NetCDF:       {nc_size_mb:.1f} MB  ({nc_path})")
+    print(f"  Metadata:     {meta_size_kb:.1f} KB  ({output_dir}/metadata.json)")
     print(f"  Grid:         {nlat} × {nlon} = {nlat * nlon:,} cells/frame")
     print(f"  Frames:       {ntimes}")
     print(f"  Total cells:  {nlat * nlon * ntimes:,}")
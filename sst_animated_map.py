@@ -6,16 +6,20 @@ https://downloads.psl.noaa.gov/Datasets/noaa.ersst.v5/sst.mnmean.nc
 """
 
 import os
+import gzip
 import requests
 import xarray as xr
 import numpy as np
+import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 
 # Configuration
 DATA_URL = "https://downloads.psl.noaa.gov/Datasets/noaa.ersst.v5/sst.mnmean.nc"
 DATA_FILE = "sst.mnmean.nc"
 OUTPUT_FILE = "sst_animated_map.html"
+FRAMES_FILE = "sst_animated_map_frames.json.gz"
 
 # Subsampling factor for performance (1 = full resolution, 2 = half, etc.)
 # Increase this if the animation is too slow
@@ -23,6 +27,14 @@ SPATIAL_SUBSAMPLE = 1
 # Time step (1 = every month, 12 = yearly, etc.)
 TIME_STEP = 1  # Monthly data (all 2064 frames)
 
+# Fetches the gzipped frames after first paint and adds them to the plot.
+# Expects FRAMES_FILE served as-is (no Content-Encoding: gzip).
+LOAD_FRAMES_JS = f"""
+fetch('{FRAMES_FILE}')
+    .then(response => new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).json())
+    .then(data => Plotly.addFrames('{{plot_id}}', data.frames));
+"""
+
 
 def download_data():
     """Download the NetCDF file if not already present."""
@@ -95,79 +107,49 @@ def create_animation(sst, ds):
     sort_idx = np.argsort(lons_converted)
     lons_sorted = lons_converted[sort_idx]
 
-    # Prepare frames
-    frames = []
-
-    for i, t in enumerate(times):
-        # Get SST data for this time step
-        sst_data = sst.sel(time=t).values
-
-        # Reorder longitudes
-        sst_sorted = sst_data[:, sort_idx]
-
-        # Convert time to string for display
-        time_str = str(t)[:7]  # YYYY-MM format
-
-        frame = go.Frame(
-            data=[go.Heatmap(
-                z=sst_sorted,
-                x=lons_sorted,
-                y=lats,
-                colorscale='RdBu_r',
-                zmin=-2,
-                zmax=32,
-                colorbar=dict(
-                    title=dict(text='SST (°C)', side='right')
-                ),
-                hoverongaps=False,
-                hovertemplate='Lon: %{x:.1f}°<br>Lat: %{y:.1f}°<br>SST: %{z:.2f}°C<extra></extra>'
-            )],
-            name=time_str,
-            layout=go.Layout(title=f"Sea Surface Temperature - {time_str}")
-        )
-        frames.append(frame)
-
-        if (i + 1) % 50 == 0:
-            print(f"  Processed {i + 1}/{len(times)} frames...")
-
-    print(f"  Total frames created: {len(frames)}")
-
-    # Create initial figure with first frame's data
-    initial_sst = sst.isel(time=0).values[:, sort_idx]
-    initial_time = str(times[0])[:7]
-
-    fig = go.Figure(
-        data=[go.Heatmap(
-            z=initial_sst,
-            x=lons_sorted,
-            y=lats,
-            colorscale='RdBu_r',
-            zmin=-2,
-            zmax=32,
-            colorbar=dict(
-                title=dict(text='SST (°C)', side='right'),
-                len=0.75
-            ),
-            hoverongaps=False,
-            hovertemplate='Lon: %{x:.1f}°<br>Lat: %{y:.1f}°<br>SST: %{z:.2f}°C<extra></extra>'
-        )],
-        frames=frames
+    # Load the whole cube once with longitudes reordered. float32 frames are
+    # embedded by plotly as base64 typed arrays instead of JSON numbers.
+    cube = sst.values[:, :, sort_idx].astype(np.float32, copy=False)
+
+    time_labels = np.datetime_as_string(times, unit='M').tolist()  # YYYY-MM format
+    initial_time = time_labels[0]
+
+    # One heatmap per time step, sharing a single layout and color axis
+    fig = px.imshow(
+        cube,
+        animation_frame=0,
+        x=lons_sorted,
+        y=lats,
+        origin='lower',
+        color_continuous_scale='RdBu_r',
+        range_color=[-2, 32],
+        labels=dict(animation_frame='date', color='SST (°C)')
     )
 
-    # Create slider steps
-    slider_steps = []
-    for i, t in enumerate(times):
-        time_str = str(t)[:7]
-        step = dict(
-            method='animate',
-            args=[[time_str], dict(
-                mode='immediate',
-                frame=dict(duration=100, redraw=True),
-                transition=dict(duration=0)
-            )],
-            label=time_str
-        )
-        slider_steps.append(step)
+    hovertemplate = 'Lon: %{x:.1f}°<br>Lat: %{y:.1f}°<br>SST: %{z:.2f}°C<extra></extra>'
+    fig.update_traces(hoverongaps=False, hovertemplate=hovertemplate)
+    for frame, time_str in zip(fig.frames, time_labels):
+        frame.data[0].update(hoverongaps=False, hovertemplate=hovertemplate)
+        frame.layout = go.Layout(title=f"Sea Surface Temperature - {time_str}")
+
+    print(f"  Total frames created: {len(fig.frames)}")
+
+    # Label slider steps with dates instead of frame indices
+    slider = fig.layout.sliders[0]
+    for step, time_str in zip(slider.steps, time_labels):
+        step.label = time_str
+    slider.update(
+        currentvalue=dict(
+            font=dict(size=14),
+            prefix='Date: ',
+            visible=True,
+            xanchor='center'
+        ),
+        pad=dict(b=10, t=50),
+        len=0.9,
+        x=0.05,
+        y=0
+    )
 
     # Update layout with animation controls
     fig.update_layout(
@@ -180,6 +162,7 @@ def create_animation(sst, ds):
         xaxis=dict(
             title='Longitude',
             range=[-180, 180],
+            autorange=False,
             dtick=60,
             showgrid=True,
             gridwidth=1,
@@ -188,6 +171,7 @@ def create_animation(sst, ds):
         yaxis=dict(
             title='Latitude',
             range=[-90, 90],
+            autorange=False,
             dtick=30,
             showgrid=True,
             gridwidth=1,
@@ -224,23 +208,10 @@ def create_animation(sst, ds):
                 ]
             )
         ],
-        sliders=[dict(
-            active=0,
-            yanchor='top',
-            xanchor='left',
-            currentvalue=dict(
-                font=dict(size=14),
-                prefix='Date: ',
-                visible=True,
-                xanchor='center'
-            ),
-            transition=dict(duration=0),
-            pad=dict(b=10, t=50),
-            len=0.9,
-            x=0.05,
-            y=0,
-            steps=slider_steps
-        )],
+        coloraxis_colorbar=dict(
+            title=dict(text='SST (°C)', side='right'),
+            len=0.75
+        ),
         margin=dict(l=60, r=60, t=100, b=80),
         paper_bgcolor='white',
         plot_bgcolor='lightgray'
@@ -267,16 +238,27 @@ def main():
     # Create animation
     fig = create_animation(sst, ds)
 
-    # Save to HTML
-    print(f"\nSaving animation to '{OUTPUT_FILE}'...")
+    # Save frames to a gzipped sidecar, loaded by the page after first paint
+    print(f"\nSaving animation frames to '{FRAMES_FILE}'...")
+    pio.json.config.default_engine = 'orjson'
+    frames = go.Figure(frames=fig.frames, layout_template=None)
+    with gzip.open(FRAMES_FILE, 'wt', encoding='utf-8') as f:
+        f.write(frames.to_json())
+    fig.frames = ()
+
+    # Save to HTML, loading Plotly from the CDN
+    print(f"Saving animation to '{OUTPUT_FILE}'...")
     fig.write_html(
         OUTPUT_FILE,
-        include_plotlyjs=True,
+        include_plotlyjs='cdn',
         full_html=True,
-        auto_open=False
+        auto_open=False,
+        div_id='sst',
+        post_script=LOAD_FRAMES_JS
     )
 
-    print(f"\nDone! Open '{OUTPUT_FILE}' in your web browser to view the animation.")
+    print(f"\nDone! Serve this directory over HTTP (e.g. 'python -m http.server')")
+    print(f"and open '{OUTPUT_FILE}' in your web browser to view the animation.")
     print("\nControls:")
     print("  - Click 'Play' to start the animation")
     print("  - Use the slider to navigate to specific dates")